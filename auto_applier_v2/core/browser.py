@@ -2,7 +2,7 @@ import asyncio
 import os
 from typing import Optional
 
-from playwright.async_api import BrowserContext, Page, Playwright, async_playwright
+from playwright.async_api import BrowserContext, Page, Playwright, Route, async_playwright
 
 try:
     from playwright_stealth import stealth_async as _stealth_async  # type: ignore
@@ -14,6 +14,43 @@ except ImportError:
     async def _stealth_async(page: Page) -> None:  # type: ignore[override]
         return None
 
+# Stylesheets stay enabled: visibility checks in the scraper and form filler
+# depend on CSS being applied. Chromium reports beacons as "ping" and CSP
+# reports as "cspviolationreport"; the other spellings cover other engines.
+_BLOCKED_RESOURCE_TYPES = frozenset(
+    {
+        "image",
+        "imageset",
+        "media",
+        "font",
+        "texttrack",
+        "beacon",
+        "ping",
+        "csp_report",
+        "cspviolationreport",
+    }
+)
+
+
+# Ad/analytics hosts; nothing on these is needed to read or apply to a job.
+_BLOCKED_URL_PARTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "adsbygoogle",
+    "px.ads.linkedin.com",
+)
+
+
+async def _block_heavy_resources(route: Route) -> None:
+    request = route.request
+    if request.resource_type in _BLOCKED_RESOURCE_TYPES or any(
+        part in request.url for part in _BLOCKED_URL_PARTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
 
 class BrowserManager:
     _instance = None
@@ -34,6 +71,7 @@ class BrowserManager:
         self._restart_lock = asyncio.Lock()
         self._is_crashed = False
         self._last_launch_args = {}
+        self._pages_served = 0
 
     @classmethod
     async def get_instance(cls) -> "BrowserManager":
@@ -46,15 +84,17 @@ class BrowserManager:
         headless: bool = False,
         executable_path: Optional[str] = None,
         channel: Optional[str] = None,
+        block_resources: bool = False,
     ) -> Page:
         self._last_launch_args = {
             "user_data_dir": user_data_dir,
             "headless": headless,
             "executable_path": executable_path,
             "channel": channel,
+            "block_resources": block_resources,
         }
         await self._ensure_playwright()
-        await self._ensure_context(user_data_dir, headless, executable_path, channel)
+        await self._ensure_context(user_data_dir, headless, executable_path, channel, block_resources)
         return await self._ensure_page()
 
     async def _ensure_playwright(self) -> None:
@@ -69,28 +109,34 @@ class BrowserManager:
         headless: bool,
         executable_path: Optional[str],
         channel: Optional[str],
+        block_resources: bool,
     ) -> None:
         if self._context is not None and not self._is_crashed:
             return
         await self._restart_if_needed()
         os.makedirs(user_data_dir, exist_ok=True)
+        # No --blink-settings=imagesEnabled=false: this is the profile the user
+        # logs into, and login checkpoints and challenges need images.
+        args = ["--disable-blink-features=AutomationControlled"]
         print("[DEBUG TERMINAL] [BROWSER] Launching persistent context...")
         try:
-            self._context = await asyncio.wait_for(
-                self._playwright.chromium.launch_persistent_context(
+            async with asyncio.timeout(60):
+                self._context = await self._playwright.chromium.launch_persistent_context(
                     user_data_dir=user_data_dir,
                     headless=headless,
                     executable_path=executable_path,
                     channel=channel,
-                    args=["--disable-blink-features=AutomationControlled"],
-                ),
-                timeout=60,
-            )
+                    args=args,
+                )
         except asyncio.TimeoutError as exc:
             raise RuntimeError("Playwright launch_persistent_context timed out") from exc
         print("[DEBUG TERMINAL] [BROWSER] Context launched.")
         self._is_crashed = False
 
+        # Routes live on the context, so each recycle starts with a fresh handler.
+        if block_resources:
+            await self._context.route("**/*", _block_heavy_resources)
+
         browser = self._context.browser
         if browser:
             browser.on("disconnected", self._on_browser_disconnected)
@@ -114,6 +160,37 @@ class BrowserManager:
 
         return self._page
 
+    async def new_page(self, block_resources: bool = True) -> Page:
+        """Opens an extra tab on the persistent context (same login session)."""
+        if self._context is None or self._is_crashed:
+            await self.launch_browser(**self._last_launch_args)
+        page = await self._context.new_page()  # type: ignore[union-attr]
+        # Extra tabs only scrape and never show a login checkpoint, so they block
+        # heavy resources even when the main tab keeps them.
+        if block_resources and not self._last_launch_args.get("block_resources"):
+            await page.route("**/*", _block_heavy_resources)
+        if _STEALTH_AVAILABLE:
+            try:
+                await _stealth_async(page)
+            except Exception:
+                pass
+        return page
+
+    async def recycle_if_needed(self, threshold: int = 25) -> Page:
+        # Playwright keeps Request/Response objects for the context's lifetime;
+        # relaunching bounds memory while the on-disk profile keeps the session.
+        self._pages_served += 1
+        if self._pages_served < threshold or self._context is None:
+            return await self._ensure_page()
+        async with self._restart_lock:
+            print(f"[DEBUG TERMINAL] [BROWSER] Recycling context after {self._pages_served} jobs...")
+            await self._safe_close_context()
+            self._context = None
+            self._page = None
+            self._is_crashed = False
+            self._pages_served = 0
+        return await self.launch_browser(**self._last_launch_args)
+
     def _on_browser_disconnected(self) -> None:
         self._is_crashed = True
 
@@ -148,3 +225,5 @@ class BrowserManager:
             pass
         self._playwright = None
         self._is_crashed = False
+        # The manager is a singleton; the next run starts counting from zero.
+        self._pages_served = 0
@@ -1,35 +1,169 @@
-﻿import json
+﻿import hashlib
+import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
 try:
     import pypdf
 except ImportError:
     pypdf = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bump when the summary format changes so cached summaries are rebuilt.
+_SUMMARY_VERSION = 2
+# Each part gets its own share of the ~600 chars so a long skills list can't
+# crowd out titles and experience.
+_SKILLS_BUDGET = 380
+_TITLES_BUDGET = 180
+_SKILL_HEADING_RE = re.compile(
+    r"^(skills|technical skills|hard skills|habilidades|tecnolog[ií]as|herramientas|competencias)\b",
+    re.IGNORECASE,
+)
+_SECTION_HEADING_RE = re.compile(
+    r"^(experience|work experience|professional experience|employment|work history|"
+    r"experiencia|experiencia profesional|education|educaci[oó]n|formaci[oó]n|"
+    r"languages|idiomas|projects|proyectos|certifications?|certificaciones|courses|cursos|"
+    r"summary|profile|perfil|about me|sobre m[ií]|contact|contacto|interests|intereses|"
+    r"references|referencias|achievements|logros|publications|publicaciones|volunteering|"
+    r"voluntariado|awards|premios)\s*:?$",
+    re.IGNORECASE,
+)
+_TITLE_RE = re.compile(
+    r"\b(engineer|developer|analyst|pentester|consultant|scout|researcher|intern|"
+    r"ingeniero|desarrollador|analista|consultor)\b",
+    re.IGNORECASE,
+)
+# Only counts that are explicitly about experience; "founded 25 years ago" is not.
+_YEARS_RE = re.compile(
+    r"(\d{1,2})\+?\s*(?:years?|yrs?)(?:\s+of)?(?:\s+[\w-]+)?\s+experience"
+    r"|(\d{1,2})\+?\s*a[ñn]os\s+de\s+experiencia"
+    r"|experien(?:ce|cia)\s*:?\s*(\d{1,2})\+?\s*(?:years?|yrs?|a[ñn]os)",
+    re.IGNORECASE,
+)
+
+
+def _is_section_heading(line: str) -> bool:
+    # PDF extraction rarely leaves blank lines between sections, so a heading is
+    # the only reliable end of the skills block. One-skill-per-line lists are
+    # short too, hence the known names or a trailing colon instead of length alone.
+    if _SECTION_HEADING_RE.match(line):
+        return True
+    return line.endswith(":") and len(line) <= 40 and "," not in line
+
+
+def _join_within(items: list[str], sep: str, budget: int) -> str:
+    out = ""
+    for item in items:
+        candidate = f"{out}{sep}{item}" if out else item
+        if len(candidate) > budget:
+            break
+        out = candidate
+    return out
+
+
+def summarize_cv(text: str) -> str:
+    """Skills, job titles and years of experience pulled from raw CV text."""
+    skills: dict[str, str] = {}
+    titles: dict[str, str] = {}
+    in_skills = False
+    for raw in text.splitlines():
+        line = raw.strip(" \t-•·*")
+        if not line or line.startswith("--- CV:"):
+            in_skills = False
+            continue
+        if _SKILL_HEADING_RE.match(line):
+            in_skills = True
+            line = line.split(":", 1)[1].strip() if ":" in line else ""
+            if not line:
+                continue
+        elif _is_section_heading(line):
+            in_skills = False
+            continue
+        if in_skills and len(line) <= 120:
+            # Several CVs repeat the same skills; dedupe item by item.
+            for skill in re.split(r"[,;|•·]", line):
+                skill = skill.strip()
+                if skill:
+                    skills.setdefault(skill.lower(), skill)
+        elif _TITLE_RE.search(line) and len(line) <= 80:
+            titles.setdefault(line.lower(), line)
+
+    years = [int(next(g for g in m.groups() if g)) for m in _YEARS_RE.finditer(text)]
+    parts = []
+    if skills:
+        parts.append("- Skills: " + _join_within(list(skills.values()), ", ", _SKILLS_BUDGET))
+    if titles:
+        parts.append("- Titles: " + _join_within(list(titles.values())[:5], "; ", _TITLES_BUDGET))
+    if years:
+        parts.append(f"- Experience: {max(years)} years")
+    return "\n".join(parts)
+
 
 class CVContextManager:
     def __init__(self, cache_path: str, llm=None) -> None:
         self.cache_path = cache_path
+        self.files_cache_path = cache_path + ".files.json"
+        self.hashes_cache_path = cache_path + ".hashes.json"
+        # In-memory copy of the main cache file, refreshed on every save.
+        self._cache_data: dict | None = None
         self.llm = llm
         self.context_text = ""
         self.cv_folder = ""
+        self.fingerprint = ""
+        self.skills_summary = ""
+        # path -> [size, mtime_ns, digest]; persisted so unchanged files are
+        # never rehashed, even across restarts.
+        self._stat_digests: dict[str, list] | None = None
 
     def build_context(self, cv_root: str, log: Callable[[str], None]) -> str:
         self.cv_folder = cv_root
         if self.context_text:
             return self.context_text
 
+        digests = self._file_digests()
+        self.fingerprint = self._fingerprint(digests)
         cached = self._load_cache() or {}
-        if cached.get("folder_path") == self.cv_folder and cached.get("text"):
+        if cached.get("fingerprint") == self.fingerprint and cached.get("text"):
             self.context_text = str(cached.get("text", ""))
             log("[CV] Cached context found. Skipping rebuild.")
             return self.context_text
 
-        self.context_text = self._read_cv_files(log)
+        self.context_text = self._read_cv_files(log, digests)
         self._save_cache()
         return self.context_text
 
+    def build_skills_summary(self) -> str:
+        """Short skills/titles/years digest of the CV used for job matching."""
+        if self.skills_summary:
+            return self.skills_summary
+        if not self.context_text:
+            return ""
+
+        cached = self._load_cache() or {}
+        if (
+            cached.get("fingerprint") == self.fingerprint
+            and cached.get("summary_version") == _SUMMARY_VERSION
+            and cached.get("skills_summary")
+        ):
+            self.skills_summary = str(cached["skills_summary"])
+            return self.skills_summary
+
+        self.skills_summary = summarize_cv(self.context_text)
+        if self.skills_summary:
+            self._save_cache()
+        return self.skills_summary
+
     def build_keywords_file(
         self,
         cv_root: str,
@@ -81,30 +215,113 @@ class CVContextManager:
             "Sports Analyst",
         ]
 
-    def _read_cv_files(self, log: Callable[[str], None]) -> str:
+    def _read_cv_files(self, log: Callable[[str], None], digests: dict[str, str]) -> str:
         if not self.cv_folder or not os.path.exists(self.cv_folder):
             return ""
 
-        files = [f for f in os.listdir(self.cv_folder) if f.lower().endswith(".pdf")]
-        if not pypdf:
-            log("[CV] Missing pypdf. Install with: pip install pypdf")
+        file_cache = self._load_cache(self.files_cache_path) or {}
+        missing = [f for f, digest in digests.items() if digest not in file_cache]
+        if missing and not (fitz or pypdf):
+            log("[CV] Missing PDF reader. Install with: pip install pymupdf")
             return ""
 
-        log(f"[CV] Reading {len(files)} PDF files...")
+        log(f"[CV] Reading {len(missing)} PDF files ({len(digests) - len(missing)} cached)...")
+        if missing:
+            paths = [os.path.join(self.cv_folder, f) for f in missing]
+            with ThreadPoolExecutor(max_workers=min(8, len(missing))) as ex:
+                for filename, text in zip(missing, ex.map(self._extract_one_pdf, paths)):
+                    if text is not None:
+                        file_cache[digests[filename]] = text
+
         full_text: list[str] = []
-        for filename in files:
-            path = os.path.join(self.cv_folder, filename)
+        current: dict[str, str] = {}
+        for filename, digest in digests.items():
+            if digest in file_cache:
+                current[digest] = file_cache[digest]
+                full_text.append(f"--- CV: {filename} ---\n{file_cache[digest]}")
+        self._save_cache(current, self.files_cache_path)
+
+        return "\n".join(full_text)
+
+    def _extract_one_pdf(self, path: str) -> str | None:
+        if fitz:
             try:
-                text = ""
-                with open(path, "rb") as f:
-                    reader = pypdf.PdfReader(f)
-                    for page in reader.pages[:2]:
-                        text += (page.extract_text() or "") + "\n"
-                full_text.append(f"--- CV: {filename} ---\n{text}")
+                with fitz.open(path) as doc:
+                    return "".join(doc[i].get_text() + "\n" for i in range(min(2, len(doc))))
             except Exception:
                 pass
+        if not pypdf:
+            return None
+        try:
+            text = ""
+            with open(path, "rb") as f:
+                reader = pypdf.PdfReader(f)
+                for page in reader.pages[:2]:
+                    text += (page.extract_text() or "") + "\n"
+            return text
+        except Exception:
+            return None
 
-        return "\n".join(full_text)
+    def _list_pdfs(self) -> list[os.DirEntry]:
+        if not self.cv_folder or not os.path.isdir(self.cv_folder):
+            return []
+        with os.scandir(self.cv_folder) as it:
+            entries = [e for e in it if e.is_file() and e.name.lower().endswith(".pdf")]
+        return sorted(entries, key=lambda e: e.name)
+
+    def _file_digests(self) -> dict[str, str]:
+        if self._stat_digests is None:
+            self._stat_digests = self._load_cache(self.hashes_cache_path) or {}
+        stamps: list[tuple[os.DirEntry, int, int]] = []
+        stale: list[str] = []
+        for entry in self._list_pdfs():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            stamps.append((entry, st.st_size, st.st_mtime_ns))
+            known = self._stat_digests.get(entry.path)
+            if not (known and known[0] == st.st_size and known[1] == st.st_mtime_ns):
+                stale.append(entry.path)
+
+        # hashlib releases the GIL on large updates, so threads hash in parallel.
+        fresh: dict[str, str | None] = {}
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(8, len(stale))) as ex:
+                fresh = dict(zip(stale, ex.map(self._hash_file, stale)))
+
+        current: dict[str, list] = {}
+        digests: dict[str, str] = {}
+        for entry, size, mtime_ns in stamps:
+            digest = fresh[entry.path] if entry.path in fresh else self._stat_digests[entry.path][2]
+            if digest is None:
+                continue
+            current[entry.path] = [size, mtime_ns, digest]
+            digests[entry.name] = digest
+
+        if stale or current.keys() != self._stat_digests.keys():
+            self._save_cache(current, self.hashes_cache_path)
+        self._stat_digests = current
+        return digests
+
+    def _hash_file(self, path: str) -> str | None:
+        h = hashlib.blake2b(digest_size=16)
+        buf = bytearray(1 << 20)
+        view = memoryview(buf)
+        try:
+            with open(path, "rb") as f:
+                while n := f.readinto(buf):
+                    h.update(view[:n])
+        except OSError:
+            return None
+        return h.hexdigest()
+
+    def _fingerprint(self, digests: dict[str, str]) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        for filename, digest in digests.items():
+            h.update(filename.encode("utf-8"))
+            h.update(bytes.fromhex(digest))
+        return h.hexdigest()
 
     def _write_keywords_file(self, path: str, keywords: list[str]) -> None:
         os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -115,17 +332,38 @@ class CVContextManager:
         except Exception:
             pass
 
-    def _load_cache(self) -> dict | None:
+    def _load_cache(self, path: str | None = None) -> dict | None:
+        main = path is None or path == self.cache_path
+        if main and self._cache_data is not None:
+            return dict(self._cache_data)
         try:
-            with open(self.cache_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(path or self.cache_path, "rb") as f:
+                raw = f.read()
+            # The text caches hold full CV text; orjson parses them several times faster.
+            data = orjson.loads(raw) if orjson else json.loads(raw)
         except Exception:
             return None
+        if main and isinstance(data, dict):
+            self._cache_data = data
+            return dict(data)
+        return data
 
-    def _save_cache(self, data: dict | None = None) -> None:
-        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+    def _save_cache(self, data: dict | None = None, path: str | None = None) -> None:
+        path = path or self.cache_path
+        if data is None:
+            data = {
+                "folder_path": self.cv_folder,
+                "fingerprint": self.fingerprint,
+                "text": self.context_text,
+                "skills_summary": self.skills_summary,
+                "summary_version": _SUMMARY_VERSION,
+            }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
         try:
-            with open(self.cache_path, "w", encoding="utf-8") as f:
-                json.dump(data or {"folder_path": self.cv_folder, "text": self.context_text}, f)
+            raw = orjson.dumps(data) if orjson else json.dumps(data).encode("utf-8")
+            with open(path, "wb") as f:
+                f.write(raw)
+            if path == self.cache_path:
+                self._cache_data = dict(data)
         except Exception:
             pass
@@ -1,16 +1,39 @@
 import asyncio
 import threading
-import time
 import traceback
+from typing import Callable
 
-from playwright.async_api import Page
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
 from .browser import BrowserManager
 from .semantic_filler import SemanticFormFiller
 from .llm_client import LLMClient
 from .tracker import JobTracker
+from llm.claw_gateway import close_async_client
 from scrapers.linkedin import LinkedInScraper
 
+_DESCRIPTION_SELECTOR = "#job-details, .jobs-description__content, article"
+_APPLY_BUTTON_SELECTOR = ".jobs-apply-button--top-card button, .jobs-apply-button"
+
+_APPLY_BUTTON_PRIORITY = [".jobs-apply-button--top-card button", ".jobs-apply-button"]
+
+# Probes the selectors in priority order and scrolls the hit into view, all in one
+# round-trip (a grouped selector would return document order, not priority).
+_FIND_APPLY_BUTTON_JS = """(selectors) => {
+    for (const sel of selectors) {
+        const el = document.querySelector(sel);
+        if (el) {
+            el.scrollIntoView({block: 'center'});
+            return el;
+        }
+    }
+    return null;
+}"""
+
+# Easy Apply opens a modal; anything else navigates away from the job view.
+_APPLY_SETTLED_JS = """() => !!document.querySelector('.jobs-easy-apply-modal')
+    || !location.href.includes('linkedin.com/jobs/view')"""
+
 
 class AutomationEngine(threading.Thread):
     def __init__(self, ui_log_queue, user_data: dict) -> None:
@@ -18,6 +41,9 @@ class AutomationEngine(threading.Thread):
         self.ui_log_queue = ui_log_queue
         self.user_data = user_data
         self.paused = False
+        self._pause_event = asyncio.Event()
+        self._pause_event.set()
+        self._loop: asyncio.AbstractEventLoop | None = None
         self._stop_requested = False
 
     def log(self, message: str) -> None:
@@ -29,25 +55,47 @@ class AutomationEngine(threading.Thread):
 
     def pause(self) -> None:
         self.paused = True
+        self._call_in_loop(self._pause_event.clear)
         self.log("[ENGINE] Paused")
 
     def resume(self) -> None:
         self.paused = False
+        self._call_in_loop(self._pause_event.set)
         self.log("[ENGINE] Resumed")
 
     def stop(self) -> None:
         self._stop_requested = True
+        self._call_in_loop(self._pause_event.set)
         self.log("[ENGINE] Stop requested")
 
+    def _call_in_loop(self, callback: Callable[[], None]) -> None:
+        # pause/resume/stop arrive from the UI thread; asyncio.Event is not thread-safe.
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(callback)
+        else:
+            callback()
+
     def run(self) -> None:
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
+            self._loop = loop
             loop.run_until_complete(self._run_async())
             loop.close()
         except Exception:
             traceback.print_exc()
 
+    def _start_match(self, llm_client: LLMClient, job: dict, cv_context: str) -> asyncio.Task | None:
+        description = job.get("description")
+        if not description:
+            return None
+        return asyncio.create_task(llm_client.evaluate_match_bool(description, cv_context))
+
+    async def _find_apply_button(self, page: Page):
+        handle = await page.evaluate_handle(_FIND_APPLY_BUTTON_JS, _APPLY_BUTTON_PRIORITY)
+        return handle.as_element()
+
     async def _run_async(self) -> None:
         try:
             self.log("[ENGINE] Iniciando componentes...")
@@ -63,10 +111,12 @@ class AutomationEngine(threading.Thread):
                 headless=False,
                 executable_path=self.user_data.get("browser_path"),
                 channel=self.user_data.get("browser_channel"),
+                block_resources=self.user_data.get("block_resources", False),
             )
 
             raw_keywords = self.user_data.get("keywords", "")
-            cv_context = self.user_data.get("cv_context", "")
+            # The short skills summary is enough for match decisions; fall back to the full CV.
+            cv_context = self.user_data.get("cv_summary") or self.user_data.get("cv_context", "")
 
             # --- GENERACIÓN DE KEYWORDS ---
             # FORZAMOS MODO MANUAL HOY PARA EVITAR ERROR 429
@@ -76,7 +126,9 @@ class AutomationEngine(threading.Thread):
                 ]
                 self.log(f"Usando lista manual de emergencia: {keyword_list}")
             else:
-                keyword_list = [k.strip() for k in raw_keywords.split(",") if k.strip()]
+                # Ordered, case-insensitive dedupe: a repeated keyword would rerun the same search.
+                unique = {k.strip().lower(): k.strip() for k in raw_keywords.split(",") if k.strip()}
+                keyword_list = list(unique.values())
 
             if not keyword_list:
                 self.log("ERROR: No hay keywords definidas.")
@@ -84,44 +136,85 @@ class AutomationEngine(threading.Thread):
 
             location = self.user_data.get("location", "Spain")
 
-            for current_keyword in keyword_list:
+            # Jobs handled recently (or already found under another keyword) are dropped
+            # by job id before their descriptions are fetched.
+            seen_jobs = tracker.tracked_job_keys(max_age_days=7)
+
+            self.log(f"[ENGINE] Buscando {len(keyword_list)} keywords en paralelo...")
+            batches = await scraper.scrape_jobs_many(
+                browser, [(keyword, location) for keyword in keyword_list], skip=seen_jobs
+            )
+
+            for current_keyword, jobs in zip(keyword_list, batches):
                 if self._stop_requested:
                     break
                 self.log(f"--- NUEVA BUSQUEDA: {current_keyword} ---")
 
                 try:
-                    jobs = await scraper.scrape_jobs(page, current_keyword, location)
                     self.log(f"Ofertas para '{current_keyword}': {len(jobs)}")
 
-                    for job in jobs:
+                    next_match: asyncio.Task | None = None
+                    for index, job in enumerate(jobs):
+                        if self._stop_requested:
+                            break
+                        await self._pause_event.wait()
                         if self._stop_requested:
                             break
-                        while self.paused:
-                            time.sleep(1)
 
+                        match_task, next_match = next_match, None
                         try:
                             self.log(f"Procesando: {job.get('title')}")
+
+                            # Descriptions come with the scraped jobs, so the next job's
+                            # evaluation runs while this one is opened and filled.
+                            if match_task is None:
+                                match_task = self._start_match(llm_client, job, cv_context)
+                            if index + 1 < len(jobs):
+                                next_match = self._start_match(llm_client, jobs[index + 1], cv_context)
+
+                            if match_task is not None and not await match_task:
+                                self.log("SKIPPED: Perfil no encaja.")
+                                tracker.track_job(job, "SKIPPED", "No Match")
+                                continue
+
+                            # Only real page loads count toward the recycle threshold.
+                            page = await browser.recycle_if_needed()
                             await page.goto(job.get("url"), wait_until="domcontentloaded")
-                            await asyncio.sleep(3)
-
-                            desc_el = await page.query_selector(
-                                "#job-details, .jobs-description__content, article"
-                            )
-                            if desc_el:
-                                text = await desc_el.inner_text()
-                                if not llm_client.evaluate_match_bool(text, cv_context):
-                                    self.log("SKIPPED: Perfil no encaja.")
-                                    tracker.track_job(job, "SKIPPED", "No Match")
-                                    continue
 
-                            apply_btn = await page.query_selector(".jobs-apply-button--top-card button")
-                            if not apply_btn:
-                                apply_btn = await page.query_selector(".jobs-apply-button")
+                            if match_task is not None:
+                                try:
+                                    await page.wait_for_selector(_APPLY_BUTTON_SELECTOR, timeout=5000)
+                                except PlaywrightTimeoutError:
+                                    pass
+                                apply_btn = await self._find_apply_button(page)
+                            else:
+                                try:
+                                    await page.wait_for_selector(_DESCRIPTION_SELECTOR, timeout=5000)
+                                except PlaywrightTimeoutError:
+                                    pass
+
+                                desc_el = await page.query_selector(_DESCRIPTION_SELECTOR)
+                                if desc_el:
+                                    text = await desc_el.inner_text()
+                                    # The LLM round-trip overlaps with locating the apply button.
+                                    is_match, apply_btn = await asyncio.gather(
+                                        llm_client.evaluate_match_bool(text, cv_context),
+                                        self._find_apply_button(page),
+                                    )
+                                    if not is_match:
+                                        self.log("SKIPPED: Perfil no encaja.")
+                                        tracker.track_job(job, "SKIPPED", "No Match")
+                                        continue
+                                else:
+                                    apply_btn = await self._find_apply_button(page)
 
                             if apply_btn:
-                                await apply_btn.scroll_into_view_if_needed()
                                 await apply_btn.click(force=True)
-                                await asyncio.sleep(2)
+                                try:
+                                    await page.wait_for_function(_APPLY_SETTLED_JS, timeout=5000)
+                                except Exception:
+                                    # Timeout, or the context was destroyed by an external redirect.
+                                    pass
 
                                 if "linkedin.com/jobs/view" not in page.url:
                                     self.log("EXTERNO: Web externa.")
@@ -143,6 +236,9 @@ class AutomationEngine(threading.Thread):
                             self.log(f"Error oferta: {e}")
                             tracker.track_job(job, "ERROR", str(e))
 
+                    if next_match is not None:
+                        next_match.cancel()
+
                 except Exception as e:
                     self.log(f"Error busqueda: {e}")
 
@@ -150,6 +246,22 @@ class AutomationEngine(threading.Thread):
         except Exception:
             traceback.print_exc()
         finally:
+            try:
+                tracker.export_to_excel()
+            except Exception:
+                pass
+            try:
+                tracker.close()
+            except Exception:
+                pass
+            try:
+                llm_client.save()
+            except Exception:
+                pass
+            try:
+                await close_async_client()
+            except Exception:
+                pass
             try:
                 await browser.close()
             except Exception:
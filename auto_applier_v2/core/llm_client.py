@@ -1,33 +1,76 @@
+import hashlib
 import json
+import os
 from typing import Any, Dict, List
 
-from llm.claw_gateway import claw_chat
+from llm.claw_gateway import claw_chat, claw_chat_async, current_model
 from llm.errors import LLMParseError
 
 
+_JSON_DECODER = json.JSONDecoder()
+_CACHE_MAX_ENTRIES = 2000
+# New entries are written in batches (and on save()), not on every miss.
+_CACHE_SAVE_EVERY = 50
+
+# Fixed instruction blocks live at module level so every request starts with a
+# byte-identical prefix, which is what server-side prefix caching keys on.
+# Stable content (instructions, profile, CV) always precedes per-call content.
+_FORM_INSTRUCTIONS = (
+    "You are an expert form-filling AI agent. "
+    "Your goal is to map the User Profile Data to the HTML Form Fields provided.\n"
+    "INSTRUCTIONS:\n"
+    "1. Output MUST be strictly valid JSON: {\"field_id_or_name\": \"value\"}.\n"
+    "2. For <select> fields: You MUST pick one of the options listed in the HTML. "
+    "Pick the closest semantic match (e.g., if User is 'Spain' and options are 'ES', 'Espana', select that).\n"
+    "3. For Phone Code: If the select has country codes (e.g., 'Spain (+34)'), match the user's country.\n"
+    "4. For Experience/Years: Calculate from the CV data if possible, otherwise use a sensible default based on seniority.\n"
+    "5. NO Markdown, NO explanation text. Just the raw JSON string.\n"
+)
+_MATCH_INSTRUCTIONS = (
+    "Role: Expert Tech Recruiter.\n"
+    "Task: Evaluate if the Candidate is a RELEVANT match for the Job Description.\n"
+    "Criteria:\n"
+    "- If the job requires specific hard skills (e.g. Java) and CV only has Python -> NO.\n"
+    "- If the roles are related (e.g. Job: 'SOC Analyst', CV: 'Cybersecurity Junior') -> YES.\n"
+    "- Ignore 'years of experience' requirements if the skills are strong.\n"
+    "- Be lenient with 'Junior' or 'Trainee' roles.\n"
+    "Output: Reply ONLY with the word 'YES' or 'NO'.\n\n"
+)
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
 class LLMClient:
-    def __init__(self) -> None:
-        pass
-
-    def analyze_html(self, html_snippet: str, user_data: dict) -> dict:
-        system = (
-            "You are an expert form-filling AI agent. "
-            "Your goal is to map the User Profile Data to the HTML Form Fields provided.\n"
-            "INSTRUCTIONS:\n"
-            "1. Output MUST be strictly valid JSON: {\"field_id_or_name\": \"value\"}.\n"
-            "2. For <select> fields: You MUST pick one of the options listed in the HTML. "
-            "Pick the closest semantic match (e.g., if User is 'Spain' and options are 'ES', 'Espana', select that).\n"
-            "3. For Phone Code: If the select has country codes (e.g., 'Spain (+34)'), match the user's country.\n"
-            "4. For Experience/Years: Calculate from the CV data if possible, otherwise use a sensible default based on seniority.\n"
-            "5. NO Markdown, NO explanation text. Just the raw JSON string.\n"
-        )
+    def __init__(self, cache_path: str | None = None) -> None:
+        self.cache_path = cache_path or os.path.join(os.getcwd(), "config", "llm_cache.json")
+        cached = self._load_cache()
+        self._match_cache: dict[str, bool] = cached.get("match", {})
+        self._form_cache: dict[str, dict] = cached.get("form", {})
+        self._unsaved = 0
+        # Changing the model or the instructions must not reuse old answers.
+        model = current_model()
+        self._form_ns = _digest(model, _FORM_INSTRUCTIONS)
+        self._match_ns = _digest(model, _MATCH_INSTRUCTIONS)
+
+    async def analyze_html(self, html_snippet: str, user_data: dict) -> dict:
+        user_json = json.dumps(user_data, ensure_ascii=False, sort_keys=True, default=str)
+        key = _digest(self._form_ns, html_snippet, user_json)
+        if key in self._form_cache:
+            return dict(self._form_cache[key])
+
         prompt = (
-            f"--- USER PROFILE ---\n{json.dumps(user_data, ensure_ascii=False)}\n\n"
+            f"--- USER PROFILE ---\n{user_json}\n\n"
             f"--- HTML FORM FIELDS ---\n{html_snippet}\n"
         )
-        text = claw_chat(
+        text = await claw_chat_async(
             [
-                {"role": "system", "content": system},
+                {"role": "system", "content": _FORM_INSTRUCTIONS},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.2,
@@ -35,31 +78,32 @@ class LLMClient:
         result = self._extract_json(text)
         if result is None:
             raise LLMParseError("LLM did not return valid JSON for analyze_html")
-        return result
+        self._remember(self._form_cache, key, result)
+        return dict(result)
 
-    def evaluate_match_bool(self, job_description: str, cv_text: str) -> bool:
+    async def evaluate_match_bool(self, job_description: str, cv_text: str) -> bool:
         if not cv_text:
             return True
-        prompt = (
-            "Role: Expert Tech Recruiter.\n"
-            "Task: Evaluate if the Candidate is a RELEVANT match for the Job Description.\n"
-            "Criteria:\n"
-            "- If the job requires specific hard skills (e.g. Java) and CV only has Python -> NO.\n"
-            "- If the roles are related (e.g. Job: 'SOC Analyst', CV: 'Cybersecurity Junior') -> YES.\n"
-            "- Ignore 'years of experience' requirements if the skills are strong.\n"
-            "- Be lenient with 'Junior' or 'Trainee' roles.\n"
-            "Output: Reply ONLY with the word 'YES' or 'NO'.\n\n"
-            f"--- JOB DESCRIPTION ---\n{job_description[:6000]}\n\n"
-            f"--- CANDIDATE CV ---\n{cv_text[:6000]}\n"
-        )
-        text = claw_chat(
+        job_description = job_description[:2000]
+        cv_text = cv_text[:6000]
+        key = _digest(self._match_ns, job_description, cv_text)
+        if key in self._match_cache:
+            return self._match_cache[key]
+
+        # The CV is identical on every call, so it goes in the system message
+        # where OpenAI-compatible servers can serve it from their prefix cache.
+        system = f"{_MATCH_INSTRUCTIONS}--- CANDIDATE CV ---\n{cv_text}\n"
+        prompt = f"--- JOB DESCRIPTION ---\n{job_description}\n"
+        text = await claw_chat_async(
             [
-                {"role": "system", "content": ""},
+                {"role": "system", "content": system},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.2,
         )
-        return "YES" in text.strip().upper()
+        is_match = "YES" in text.strip().upper()
+        self._remember(self._match_cache, key, is_match)
+        return is_match
 
     def generate_keywords(self, cv_text: str) -> List[str]:
         prompt = (
@@ -77,16 +121,45 @@ class LLMClient:
         )
         return [k.strip() for k in text.split(",") if k.strip()][:5]
 
-    def _extract_json(self, text: str) -> Dict[str, Any] | None:
+    def save(self) -> None:
+        """Writes pending cache entries; call once the run is over."""
+        if self._unsaved:
+            self._save_cache()
+
+    def _remember(self, cache: dict, key: str, value: Any) -> None:
+        cache[key] = value
+        while len(cache) > _CACHE_MAX_ENTRIES:
+            del cache[next(iter(cache))]
+        self._unsaved += 1
+        if self._unsaved >= _CACHE_SAVE_EVERY:
+            self._save_cache()
+
+    def _load_cache(self) -> dict:
         try:
-            return json.loads(text)
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
         except Exception:
-            pass
+            return {}
+
+    def _save_cache(self) -> None:
+        # Written to a temp file and swapped in, so a crash mid-write can't
+        # leave a truncated cache behind.
+        tmp_path = self.cache_path + ".tmp"
         try:
-            start = text.find("{")
-            end = text.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                return json.loads(text[start : end + 1])
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"match": self._match_cache, "form": self._form_cache}, f)
+            os.replace(tmp_path, self.cache_path)
+            self._unsaved = 0
         except Exception:
             pass
-        return None
+
+    def _extract_json(self, text: str) -> Dict[str, Any] | None:
+        start = text.find("{")
+        if start == -1:
+            return None
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            return None
+        return obj
@@ -1,11 +1,131 @@
-import asyncio
 import re
 from typing import Any, Dict
 
-from playwright.async_api import Page
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
 from .llm_client import LLMClient
 
+_FIELD_SELECTOR = "input, textarea, select, fieldset div[role='radio']"
+
+# Describes every candidate field in one round-trip instead of several
+# evaluate/get_attribute calls per element, tagging each with data-aa-idx.
+_DESCRIBE_FIELDS_JS = """(root, selector) => Array.from(root.querySelectorAll(selector)).map((el, idx) => {
+    el.setAttribute('data-aa-idx', String(idx));
+    const rect = el.getBoundingClientRect();
+    const visible = rect.width > 0 && rect.height > 0
+        && window.getComputedStyle(el).visibility !== 'hidden';
+    let label = null;
+    if (el.id) label = document.querySelector(`label[for="${CSS.escape(el.id)}"]`);
+    if (!label) label = el.closest('label');
+    if (!label && el.closest('fieldset')) label = el.closest('fieldset').querySelector('legend');
+    let options = '';
+    if (el.tagName === 'SELECT') {
+        const opts = Array.from(el.options);
+        options = opts.length > 20
+            ? opts.slice(0, 10).map(o => o.text).join('|') + '|... (Choose closest match)'
+            : opts.map(o => o.text).join('|');
+    }
+    return {
+        visible,
+        tag: el.tagName.toLowerCase(),
+        type: (el.getAttribute('type') || '').toLowerCase(),
+        id: el.getAttribute('id') || '',
+        name: el.getAttribute('name') || '',
+        label: label ? label.innerText : '',
+        options,
+        idx,
+    };
+})"""
+
+# Checked in priority order: submit beats review beats next.
+_MODAL_BUTTONS = [
+    ["submit", "button[aria-label*='Submit'], button[aria-label*='Enviar solicitud']"],
+    ["review", "button[aria-label*='Review'], button[aria-label*='Revisar']"],
+    ["next", "button[aria-label*='Next'], button[aria-label*='Siguiente']"],
+]
+
+# Identifies the current Easy Apply step: its heading plus the progress value.
+_STEP_SIGNATURE_JS = """(modal) => {
+    const heading = modal.querySelector('h3, h2');
+    const progress = modal.querySelector('[role="progressbar"], progress');
+    return [
+        heading ? heading.textContent.trim() : '',
+        progress ? (progress.getAttribute('aria-valuenow') || progress.getAttribute('value') || '') : '',
+    ].join('|');
+}"""
+
+# Finds and clicks the first visible modal button in one round-trip and reports
+# which one it was. The button and step signature are kept for _STEP_CHANGED_JS.
+_CLICK_NEXT_ACTION_JS = """(root, buttons) => {
+    const signature = """ + _STEP_SIGNATURE_JS + """;
+    for (const [action, selector] of buttons) {
+        for (const el of root.querySelectorAll(selector)) {
+            const rect = el.getBoundingClientRect();
+            if (rect.width === 0 || rect.height === 0) continue;
+            if (getComputedStyle(el).visibility === 'hidden') continue;
+            window.__aaLastStep = {button: el, signature: signature(root)};
+            el.click();
+            return action;
+        }
+    }
+    return null;
+}"""
+
+# True once the clicked step is gone: the modal closed, the button detached, the
+# heading/progress moved on, or a validation error pinned the current step.
+_STEP_CHANGED_JS = """() => {
+    const last = window.__aaLastStep;
+    const modal = document.querySelector('.jobs-easy-apply-modal');
+    if (!last || !modal || !last.button.isConnected) return true;
+    if (modal.querySelector('.artdeco-inline-feedback--error')) return true;
+    return (""" + _STEP_SIGNATURE_JS + """)(modal) !== last.signature;
+}"""
+
+# Applies the LLM mapping to the tagged fields in a single round-trip. Values
+# go through the native setter so framework-controlled inputs see the change.
+_APPLY_FILLS_JS = """(root, fills) => {
+    const failed = [];
+    const fire = (el) => {
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+    };
+    for (const f of fills) {
+        const el = root.querySelector(`[data-aa-idx="${f.idx}"]`);
+        if (!el) {
+            failed.push(f.idx);
+            continue;
+        }
+        try {
+            if (f.type === 'radio' || el.getAttribute('role') === 'radio') {
+                el.click();
+            } else if (f.type === 'checkbox') {
+                const want = ['true', 'yes', 'si', '1'].includes(f.value.toLowerCase());
+                if (want !== el.checked) el.click();
+            } else if (f.tag === 'select') {
+                const opts = Array.from(el.options);
+                const wanted = f.value.toLowerCase();
+                const opt = opts.find(o => o.label === f.value)
+                    || opts.find(o => o.text.toLowerCase().includes(wanted));
+                if (!opt) {
+                    failed.push(f.idx);
+                    continue;
+                }
+                el.value = opt.value;
+                fire(el);
+            } else {
+                const proto = f.tag === 'textarea' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+                el.focus();
+                Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, f.value);
+                fire(el);
+                el.blur();
+            }
+        } catch (e) {
+            failed.push(f.idx);
+        }
+    }
+    return failed;
+}"""
+
 
 class SemanticFormFiller:
     def __init__(self, llm: LLMClient | None = None) -> None:
@@ -17,8 +137,6 @@ class SemanticFormFiller:
 
         while step < max_steps:
             print(f"[FILLER] Paso {step + 1}: Analizando formulario...")
-            await asyncio.sleep(2)
-
             modal = await page.query_selector(".jobs-easy-apply-modal")
             if not modal:
                 print("[FILLER] No modal. Puede que hayamos terminado.")
@@ -26,7 +144,7 @@ class SemanticFormFiller:
 
             await self._fill_visible_inputs(page, modal, user_data)
 
-            if await self._handle_buttons(modal):
+            if await self._handle_buttons(page, modal):
                 print("[FILLER] Proceso finalizado con exito.")
                 return
 
@@ -34,72 +152,48 @@ class SemanticFormFiller:
 
         print("[FILLER] Limite de pasos alcanzado.")
 
-    async def _handle_buttons(self, modal) -> bool:
-        submit_btn = await modal.query_selector(
-            "button[aria-label*='Submit'], button[aria-label*='Enviar solicitud']"
-        )
-        if submit_btn and await submit_btn.is_visible():
-            print("[FILLER] Click en ENVIAR SOLICITUD.")
-            await submit_btn.click()
-            await asyncio.sleep(3)
+    async def _handle_buttons(self, page: Page, modal) -> bool:
+        action = await modal.evaluate(_CLICK_NEXT_ACTION_JS, _MODAL_BUTTONS)
+        if action is None:
             return True
-
-        review_btn = await modal.query_selector(
-            "button[aria-label*='Review'], button[aria-label*='Revisar']"
-        )
-        if review_btn and await review_btn.is_visible():
+        if action == "submit":
+            print("[FILLER] Click en ENVIAR SOLICITUD.")
+        elif action == "review":
             print("[FILLER] Click en REVISAR.")
-            await review_btn.click()
-            return False
-
-        next_btn = await modal.query_selector(
-            "button[aria-label*='Next'], button[aria-label*='Siguiente']"
-        )
-        if next_btn and await next_btn.is_visible():
+        else:
             print("[FILLER] Click en SIGUIENTE.")
-            await next_btn.click()
-            return False
+        await self._wait_for_step_change(page)
+        return action == "submit"
 
-        return True
+    async def _wait_for_step_change(self, page: Page) -> None:
+        # The modal stays open across steps, so waiting for it says nothing;
+        # reading fields before the step swaps would refill the previous one.
+        try:
+            await page.wait_for_function(_STEP_CHANGED_JS, timeout=5000)
+        except PlaywrightTimeoutError:
+            pass
 
     async def _fill_visible_inputs(self, page: Page, container: Any, user_data: dict) -> None:
-        elements = await container.query_selector_all(
-            "input, textarea, select, fieldset div[role='radio']"
-        )
-
-        if not elements:
+        descriptors = await container.evaluate(_DESCRIBE_FIELDS_JS, _FIELD_SELECTOR)
+        if not descriptors:
             return
 
         simplified = []
-        element_handles = []
+        element_refs = []
 
-        for el in elements:
-            if not await el.is_visible():
+        for desc in descriptors:
+            if not desc["visible"]:
                 continue
 
-            tag = await el.evaluate("el => el.tagName.toLowerCase()")
-            input_type = (await el.get_attribute("type") or "").lower()
+            tag = desc["tag"]
+            input_type = desc["type"]
 
             if input_type in ["hidden", "submit", "button", "image"]:
                 continue
 
-            label_text = await el.evaluate(
-                """(el) => {
-                let label = null;
-                if (el.id) label = document.querySelector(`label[for=\"${el.id}\"]`);
-                if (!label) label = el.closest('label');
-                if (!label && el.closest('fieldset')) label = el.closest('fieldset').querySelector('legend');
-                return label ? label.innerText : '';
-            }"""
-            )
-
-            label_text = (label_text or "").replace("\n", " ").strip()
-            name = await el.get_attribute("name") or ""
-            ident = await el.get_attribute("id") or name or f"elem_{len(simplified)}"
-
-            options_text = ""
-            if tag == "select":
-                options_text = await self._get_optimized_options(el)
+            label_text = (desc["label"] or "").replace("\n", " ").strip()
+            name = desc["name"]
+            ident = desc["id"] or name or f"elem_{len(simplified)}"
 
             simplified.append(
                 {
@@ -107,22 +201,24 @@ class SemanticFormFiller:
                     "type": input_type,
                     "ident": ident,
                     "label": label_text,
-                    "options": options_text,
+                    "options": desc["options"],
                 }
             )
-            element_handles.append((el, ident, tag, input_type))
+            element_refs.append((desc["idx"], ident, tag, input_type))
 
         if not simplified:
             return
 
         html_snippet = "\n".join([str(s) for s in simplified])
         print("[FILLER] Consultando a Ollama...")
-        mapping = self.llm.analyze_html(html_snippet, user_data)
+        mapping = await self.llm.analyze_html(html_snippet, user_data)
 
         if not mapping:
             return
 
-        for el, ident, tag, input_type in element_handles:
+        fills = []
+        file_idxs = []
+        for idx, ident, tag, input_type in element_refs:
             if ident not in mapping:
                 continue
 
@@ -131,47 +227,25 @@ class SemanticFormFiller:
                 continue
 
             print(f"   -> Intentando rellenar {ident} ({tag}) con '{value}'")
+            if input_type == "file":
+                file_idxs.append(idx)
+            else:
+                fills.append({"idx": idx, "tag": tag, "type": input_type, "value": value})
 
+        if fills:
             try:
-                if input_type == "radio":
-                    await el.evaluate("el => el.click()")
-                    continue
-
-                if input_type == "checkbox":
-                    should_check = value.lower() in ["true", "yes", "si", "1"]
-                    if should_check != await el.is_checked():
-                        await el.click(force=True)
-                    continue
-
-                if tag == "select":
-                    try:
-                        await el.select_option(label=value)
-                    except Exception:
-                        opts = await el.query_selector_all("option")
-                        for o in opts:
-                            txt = await o.inner_text()
-                            if value.lower() in txt.lower():
-                                await el.select_option(value=await o.get_attribute("value"))
-                                break
-                    continue
-
-                if input_type == "file":
-                    if user_data.get("cv_path"):
-                        await el.set_input_files(user_data.get("cv_path"))
-                    continue
-
-                await el.fill(value)
-
+                failed = await container.evaluate(_APPLY_FILLS_JS, fills)
+                for idx in failed:
+                    print(f"   -> Error menor rellenando campo: data-aa-idx={idx}")
             except Exception as e:
-                print(f"   -> Error menor rellenando campo: {e}")
-
-    async def _get_optimized_options(self, el) -> str:
-        return await el.evaluate(
-            """el => {
-            const opts = Array.from(el.options);
-            if (opts.length > 20) {
-                return opts.slice(0, 10).map(o => o.text).join('|') + '|... (Choose closest match)';
-            }
-            return opts.map(o => o.text).join('|');
-        }"""
-        )
+                print(f"   -> Error menor rellenando campos: {e}")
+
+        # File inputs need Playwright's set_input_files; there is no DOM equivalent.
+        if file_idxs and user_data.get("cv_path"):
+            for idx in file_idxs:
+                try:
+                    el = await container.query_selector(f"[data-aa-idx='{idx}']")
+                    if el:
+                        await el.set_input_files(user_data.get("cv_path"))
+                except Exception as e:
+                    print(f"   -> Error menor rellenando campo: {e}")
@@ -1,46 +1,164 @@
+import atexit
+import json
 import os
-from datetime import datetime
+import queue
+import re
+import threading
+import time
 
-import pandas as pd
+COLUMNS = [
+    "Fecha",
+    "Hora",
+    "Puesto",
+    "Empresa",
+    "Estado",
+    "Motivo/Detalle",
+    "URL",
+]
+
+# Shared by every tracker so appends from parallel workers never interleave.
+_WRITE_LOCK = threading.Lock()
+_STOP = object()
+
+# Matches both /jobs/view/<id>/ and /jobs/view/<slug>-<id> on any subdomain.
+_JOB_ID_RE = re.compile(r"/jobs/view/(?:[^/?]*-)?(\d+)")
+
+
+def job_key(url: str) -> str:
+    """LinkedIn job id for a job URL, or the URL itself when it has none."""
+    match = _JOB_ID_RE.search(url or "")
+    return match.group(1) if match else url
 
 
 class JobTracker:
-    def __init__(self, filename: str = "tracking_ofertas.xlsx") -> None:
+    def __init__(self, filename: str = "tracking_ofertas.jsonl") -> None:
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.filepath = os.path.join(base_dir, filename)
-        self._ensure_file_exists()
+        self.legacy_xlsx = os.path.join(base_dir, "tracking_ofertas.xlsx")
+        self._import_legacy_excel()
+        # Rows are handed to one writer thread that keeps the file open and
+        # flushes whenever it catches up, so track_job never touches the disk.
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
 
-    def _ensure_file_exists(self) -> None:
-        if not os.path.exists(self.filepath):
-            df = pd.DataFrame(
-                columns=[
-                    "Fecha",
-                    "Hora",
-                    "Puesto",
-                    "Empresa",
-                    "Estado",
-                    "Motivo/Detalle",
-                    "URL",
-                ]
-            )
-            df.to_excel(self.filepath, index=False)
+    def _import_legacy_excel(self) -> None:
+        # Older versions kept the whole history only in the workbook; copy it
+        # into the JSONL once so it is neither lost nor invisible to dedupe.
+        marker = self.filepath + ".imported"
+        if not os.path.exists(self.legacy_xlsx) or os.path.exists(marker):
+            return
+        try:
+            import pandas as pd
+
+            df = pd.read_excel(self.legacy_xlsx, dtype=str).reindex(columns=COLUMNS).fillna("")
+            tmp_path = self.filepath + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for row in df.to_dict("records"):
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                if os.path.exists(self.filepath):
+                    with open(self.filepath, "r", encoding="utf-8") as current:
+                        f.writelines(current)
+            os.replace(tmp_path, self.filepath)
+            open(marker, "w").close()
+            print(f"[TRACKER] Historial importado desde Excel: {len(df)} filas")
+        except Exception as exc:
+            print(f"[TRACKER] Error importando historial Excel: {exc}")
 
     def track_job(self, job_data: dict, status: str, details: str = "") -> None:
         try:
-            now = datetime.now()
-            new_row = {
-                "Fecha": now.strftime("%Y-%m-%d"),
-                "Hora": now.strftime("%H:%M:%S"),
-                "Puesto": job_data.get("title", "N/A"),
-                "Empresa": job_data.get("company", "N/A"),
-                "Estado": status,
-                "Motivo/Detalle": details,
-                "URL": job_data.get("url", "N/A"),
-            }
-
-            df = pd.read_excel(self.filepath)
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            df.to_excel(self.filepath, index=False)
+            fecha, hora = time.strftime("%Y-%m-%d %H:%M:%S").split(" ")
+            row = dict(
+                zip(
+                    COLUMNS,
+                    [
+                        fecha,
+                        hora,
+                        job_data.get("title", "N/A"),
+                        job_data.get("company", "N/A"),
+                        status,
+                        details,
+                        job_data.get("url", "N/A"),
+                    ],
+                )
+            )
+            line = json.dumps(row, ensure_ascii=False) + "\n"
+
+            self._queue.put_nowait(line)
             print(f"[TRACKER] Guardado: {status} - {job_data.get('title')}")
         except Exception as exc:
-            print(f"[TRACKER] Error guardando Excel: {exc}")
+            print(f"[TRACKER] Error guardando JSONL: {exc}")
+
+    def _write_loop(self) -> None:
+        f = None
+        try:
+            while True:
+                line = self._queue.get()
+                try:
+                    if line is _STOP:
+                        return
+                    if f is None:
+                        f = open(self.filepath, "a", encoding="utf-8")
+                    with _WRITE_LOCK:
+                        f.write(line)
+                        if self._queue.empty():
+                            f.flush()
+                except Exception as exc:
+                    print(f"[TRACKER] Error guardando JSONL: {exc}")
+                finally:
+                    self._queue.task_done()
+        finally:
+            if f is not None:
+                f.close()
+
+    def flush(self) -> None:
+        """Blocks until every queued row has been written and flushed."""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        # The atexit hook is only a fallback; once closed it must not keep
+        # this tracker alive until the process exits.
+        atexit.unregister(self.close)
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=5)
+
+    def tracked_job_keys(
+        self, max_age_days: int = 7, retry_statuses: tuple[str, ...] = ("ERROR", "FALLIDO")
+    ) -> set[str]:
+        """job_key of jobs tracked in the last max_age_days, except outcomes worth retrying."""
+        self.flush()
+        cutoff = time.strftime("%Y-%m-%d", time.localtime(time.time() - max_age_days * 86400))
+        keys: set[str] = set()
+        try:
+            with _WRITE_LOCK, open(self.filepath, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue
+                    if row.get("Fecha", "") >= cutoff and row.get("Estado") not in retry_statuses:
+                        keys.add(job_key(row.get("URL", "")))
+        except OSError:
+            pass
+        keys.discard("N/A")
+        keys.discard("")
+        return keys
+
+    def export_to_excel(self, filename: str = "tracking_ofertas_export.xlsx") -> None:
+        # Never the legacy workbook's name: it may still hold unimported history.
+        self.flush()
+        if not os.path.exists(self.filepath):
+            return
+        xlsx_path = os.path.join(os.path.dirname(self.filepath), filename)
+        try:
+            import pandas as pd
+
+            with _WRITE_LOCK:
+                df = pd.read_json(self.filepath, lines=True, dtype=False)
+            df.reindex(columns=COLUMNS).to_excel(xlsx_path, index=False)
+            print(f"[TRACKER] Excel exportado: {xlsx_path}")
+        except Exception as exc:
+            print(f"[TRACKER] Error exportando Excel: {exc}")
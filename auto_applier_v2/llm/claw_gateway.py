@@ -1,3 +1,6 @@
+import asyncio
+import atexit
+import hashlib
 import os
 from typing import Any, Dict, List
 
@@ -7,37 +10,75 @@ DEFAULT_URL = "http://127.0.0.1:18789/v1/chat/completions"
 DEFAULT_MODEL = "openclaw"
 DEFAULT_TIMEOUT = 60
 
+_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=8)
+
+_CLIENT = httpx.Client(timeout=httpx.Timeout(DEFAULT_TIMEOUT), limits=_LIMITS)
+atexit.register(_CLIENT.close)
+
+# AsyncClient connections belong to the event loop that opened them, and the
+# engine runs a fresh loop per run, so the async client is rebuilt per loop.
+_async_client: httpx.AsyncClient | None = None
+_async_client_loop: asyncio.AbstractEventLoop | None = None
+
+_last_system_digest: str | None = None
+_prefix_cache_warned = False
+
+
+# The gateway settings never change while the app runs, so they are read once.
+_CONFIG: Dict[str, Any] = {
+    "token": os.getenv("OPENCLAW_GATEWAY_TOKEN", "").strip(),
+    "url": os.getenv("CLAW_URL", DEFAULT_URL).strip() or DEFAULT_URL,
+    "model": os.getenv("CLAW_MODEL", DEFAULT_MODEL).strip() or DEFAULT_MODEL,
+    "timeout": float(os.getenv("CLAW_TIMEOUT_SECONDS", str(DEFAULT_TIMEOUT))),
+}
+
+
+def current_model() -> str:
+    return _CONFIG["model"]
+
 
 def _require_token() -> str:
-    token = os.getenv("OPENCLAW_GATEWAY_TOKEN", "").strip()
+    token = _CONFIG["token"]
     if not token:
         raise ValueError("OPENCLAW_GATEWAY_TOKEN no seteada")
     return token
 
 
-def claw_chat(messages: List[Dict[str, Any]], temperature: float = 0.2) -> str:
+def _build_request(
+    messages: List[Dict[str, Any]], temperature: float
+) -> tuple[str, Dict[str, Any], Dict[str, str], float]:
     token = _require_token()
-    url = os.getenv("CLAW_URL", DEFAULT_URL).strip() or DEFAULT_URL
-    model = os.getenv("CLAW_MODEL", DEFAULT_MODEL).strip() or DEFAULT_MODEL
-    timeout_seconds = float(os.getenv("CLAW_TIMEOUT_SECONDS", str(DEFAULT_TIMEOUT)))
 
     headers = {"Authorization": f"Bearer {token}"}
     payload = {
-        "model": model,
+        "model": _CONFIG["model"],
         "messages": messages,
         "temperature": temperature,
     }
+    return _CONFIG["url"], payload, headers, _CONFIG["timeout"]
+
+
+def _check_prefix_cache(messages: List[Dict[str, Any]], data: Dict[str, Any]) -> None:
+    global _last_system_digest, _prefix_cache_warned
+    system = next((m.get("content") for m in messages if m.get("role") == "system"), "")
+    if not system or not isinstance(data, dict):
+        return
+    digest = hashlib.blake2b(str(system).encode("utf-8"), digest_size=16).hexdigest()
+    repeated = digest == _last_system_digest
+    _last_system_digest = digest
+    if not repeated or _prefix_cache_warned:
+        return
+    usage = data.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    if not details.get("cached_tokens"):
+        _prefix_cache_warned = True
+        print(
+            "[LLM] El gateway no reporta prompt caching: "
+            "el system prompt repetido se procesa completo en cada llamada."
+        )
 
-    try:
-        with httpx.Client(timeout=timeout_seconds) as client:
-            response = client.post(url, json=payload, headers=headers)
-    except httpx.TimeoutException as exc:
-        raise RuntimeError("Is the SSH tunnel up?") from exc
-    except httpx.ConnectError as exc:
-        raise RuntimeError("Is the SSH tunnel up?") from exc
-    except httpx.RequestError as exc:
-        raise RuntimeError("Is the SSH tunnel up?") from exc
 
+def _parse_response(response: httpx.Response, messages: List[Dict[str, Any]]) -> str:
     if response.status_code == 401:
         raise RuntimeError("Token incorrecto")
     if response.status_code >= 400:
@@ -49,6 +90,8 @@ def claw_chat(messages: List[Dict[str, Any]], temperature: float = 0.2) -> str:
     except ValueError as exc:
         raise RuntimeError("OpenClaw Gateway devolvio JSON invalido") from exc
 
+    _check_prefix_cache(messages, data)
+
     try:
         content = data["choices"][0]["message"]["content"]
     except Exception as exc:
@@ -57,3 +100,52 @@ def claw_chat(messages: List[Dict[str, Any]], temperature: float = 0.2) -> str:
         ) from exc
 
     return (content or "").strip()
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(timeout=httpx.Timeout(DEFAULT_TIMEOUT), limits=_LIMITS)
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+def claw_chat(messages: List[Dict[str, Any]], temperature: float = 0.2) -> str:
+    url, payload, headers, timeout_seconds = _build_request(messages, temperature)
+
+    try:
+        response = _CLIENT.post(url, json=payload, headers=headers, timeout=timeout_seconds)
+    except httpx.TimeoutException as exc:
+        raise RuntimeError("Is the SSH tunnel up?") from exc
+    except httpx.ConnectError as exc:
+        raise RuntimeError("Is the SSH tunnel up?") from exc
+    except httpx.RequestError as exc:
+        raise RuntimeError("Is the SSH tunnel up?") from exc
+
+    return _parse_response(response, messages)
+
+
+async def claw_chat_async(messages: List[Dict[str, Any]], temperature: float = 0.2) -> str:
+    url, payload, headers, timeout_seconds = _build_request(messages, temperature)
+
+    try:
+        response = await _get_async_client().post(
+            url, json=payload, headers=headers, timeout=timeout_seconds
+        )
+    except httpx.TimeoutException as exc:
+        raise RuntimeError("Is the SSH tunnel up?") from exc
+    except httpx.ConnectError as exc:
+        raise RuntimeError("Is the SSH tunnel up?") from exc
+    except httpx.RequestError as exc:
+        raise RuntimeError("Is the SSH tunnel up?") from exc
+
+    return _parse_response(response, messages)
@@ -1,93 +1,278 @@
 from __future__ import annotations
 
 import asyncio
-import random
+import os
+import re
 from urllib.parse import quote_plus
 
-from playwright.async_api import Page
+from playwright.async_api import Page, Response, TimeoutError as PlaywrightTimeoutError
+
+from core.browser import BrowserManager
+from core.tracker import job_key
+
+_URN_ID_RE = re.compile(r"jobPosting:(\d+)")
+_VOYAGER_WAIT_SECONDS = 8
+_DESCRIPTION_ENDPOINT = "/jobs-guest/jobs/api/jobPosting/"
+
+# Fetches the guest job-posting fragment for one id from inside the page (same
+# origin, no rendering or subresources) and returns the description text.
+_FETCH_DESCRIPTION_JS = """async ([endpoint, id]) => {
+    try {
+        const resp = await fetch(endpoint + id, {credentials: 'include'});
+        if (!resp.ok) return '';
+        const doc = new DOMParser().parseFromString(await resp.text(), 'text/html');
+        const el = doc.querySelector('.show-more-less-html__markup, .description__text');
+        return el ? el.textContent.trim() : '';
+    } catch (e) {
+        return '';
+    }
+}"""
+
+# Bare "li" matched every nav/footer item on the page; only job cards are wanted.
+_CARD_SELECTOR = (
+    "div.job-card-container, div.base-card, div.job-search-card, "
+    "li.jobs-search-results__list-item"
+)
+
+# Reads every card in one round-trip instead of several awaited calls per card.
+# The selector union matches the same job several times, so cards are deduped
+# by href before any text is read.
+_EXTRACT_CARDS_JS = """(selector) => {
+    const EASY_APPLY_MARKERS = ['easy apply', 'sencilla', 'facilmente'];
+    const out = [];
+    const seen = new Set();
+    for (const card of document.querySelectorAll(selector)) {
+        const link = card.querySelector("a[href*='/jobs/view/'], a[href*='currentJobId']");
+        const href = link && link.getAttribute('href');
+        if (!href) continue;
+        const url = href.split('?')[0];
+        if (seen.has(url)) continue;
+        seen.add(url);
+        const title = card.querySelector('strong, h3, .job-card-list__title, .base-search-card__title');
+        const company = card.querySelector('.job-card-container__company-name, h4, .base-search-card__subtitle');
+        // textContent needs no layout pass, and only the flag crosses back to Python.
+        const text = (card.textContent || '').toLowerCase();
+        out.push({
+            url,
+            title: title ? title.innerText.trim() : 'Unknown Title',
+            company: company ? company.innerText.trim() : 'Unknown Company',
+            easy_apply: EASY_APPLY_MARKERS.some((m) => text.includes(m)),
+        });
+    }
+    return out;
+}"""
+
+
+def _is_voyager_jobs_response(url: str) -> bool:
+    lowered = url.lower()
+    return "/voyager/api/" in lowered and ("jobcard" in lowered or "jobsearch" in lowered)
+
+
+def _parse_voyager_jobs(data: dict) -> list[dict]:
+    """Extracts job cards from a normalized voyager payload ("included" entities)."""
+    jobs: list[dict] = []
+    for item in data.get("included") or []:
+        if not isinstance(item, dict) or "jobPostingTitle" not in item:
+            continue
+        urn = item.get("*jobPosting") or item.get("jobPostingUrn") or item.get("entityUrn") or ""
+        match = _URN_ID_RE.search(str(urn))
+        if not match:
+            continue
+        company = (item.get("primaryDescription") or {}).get("text") or "Unknown Company"
+        footer = str(item.get("footerItems") or "")
+        jobs.append(
+            {
+                "title": str(item.get("jobPostingTitle") or "Unknown Title").strip(),
+                "company": str(company).strip(),
+                "url": f"https://www.linkedin.com/jobs/view/{match.group(1)}/",
+                "easy_apply": "EASY_APPLY" in footer,
+            }
+        )
+    return jobs
 
 
 class LinkedInScraper:
-    async def scrape_jobs(self, page: Page, keywords: str, location: str) -> list[dict]:
+    def __init__(self) -> None:
+        # Bounds every request made on the shared session, navigations and
+        # description fetches alike, across all tabs; LinkedIn throttles quickly.
+        self._concurrency = max(1, int(os.getenv("LI_CONCURRENCY", "8")))
+        self._sem = asyncio.Semaphore(self._concurrency)
+
+    async def scrape_jobs(
+        self, page: Page, keywords: str, location: str, skip: set[str] | None = None
+    ) -> list[dict]:
         kw = quote_plus(keywords or "")
         loc = quote_plus(location or "")
 
         url = f"https://www.linkedin.com/jobs/search?keywords={kw}&location={loc}"
 
-        print(f"[SCRAPER] Navegando a: {url}")
-        await page.goto(url, wait_until="domcontentloaded")
+        captured: dict[str, dict] = {}
+        arrived = asyncio.Event()
+
+        async def capture(response: Response) -> None:
+            if not _is_voyager_jobs_response(response.url):
+                return
+            try:
+                data = await response.json()
+            except Exception:
+                return
+            for job in _parse_voyager_jobs(data if isinstance(data, dict) else {}):
+                captured.setdefault(job["url"], job)
+            if captured:
+                arrived.set()
+
+        async with self._sem:
+            page.on("response", capture)
+            try:
+                print(f"[SCRAPER] Navegando a: {url}")
+                await page.goto(url, wait_until="domcontentloaded")
+                await self._wait_for_results(page, arrived)
+            finally:
+                page.remove_listener("response", capture)
+
+            if captured:
+                results = list(captured.values())
+                for job in results:
+                    print(f"   -> [ENCONTRADO] {job['title']}")
+            else:
+                print("[SCRAPER] Sin respuesta JSON de LinkedIn, leyendo el DOM...")
+                results = await self._scrape_cards_dom(page)
+
+        if skip is not None:
+            # Dropped before descriptions are fetched. skip is shared by every
+            # query, so a job found under two keywords is only kept once.
+            fresh = []
+            for job in results:
+                key = job_key(job["url"])
+                if key not in skip:
+                    skip.add(key)
+                    fresh.append(job)
+            if len(fresh) < len(results):
+                print(f"[SCRAPER] Ya procesadas (omitidas): {len(results) - len(fresh)}")
+            results = fresh
+
+        await self._attach_descriptions(page, results)
 
-        await asyncio.sleep(random.uniform(3, 5))
+        print(f"[SCRAPER] Total ofertas encontradas: {len(results)}")
+        return results
+
+    async def scrape_jobs_many(
+        self,
+        browser: BrowserManager,
+        queries: list[tuple[str, str]],
+        concurrency: int | None = None,
+        skip: set[str] | None = None,
+    ) -> list[list[dict]]:
+        # A persistent context can't spawn sibling contexts, so searches run on a
+        # small pool of tabs from the shared, logged-in context, each reused for
+        # several queries instead of opening a tab per query.
+        results: list[list[dict]] = [[] for _ in queries]
+        pending = iter(enumerate(queries))
+
+        async def worker() -> None:
+            page = await browser.new_page()
+            try:
+                for index, (keywords, location) in pending:
+                    try:
+                        results[index] = await self.scrape_jobs(page, keywords, location, skip)
+                    except Exception as exc:
+                        print(f"[SCRAPER] Error buscando '{keywords}': {exc}")
+            finally:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
 
+        workers = min(concurrency or self._concurrency, len(queries))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def _wait_for_results(self, page: Page, arrived: asyncio.Event) -> None:
+        # The guest page renders its cards server-side and never sends voyager
+        # JSON, so whichever shows up first ends the wait.
+        json_wait = asyncio.ensure_future(arrived.wait())
+        card_wait = asyncio.ensure_future(
+            page.wait_for_selector(
+                _CARD_SELECTOR, state="attached", timeout=_VOYAGER_WAIT_SECONDS * 1000
+            )
+        )
+        await asyncio.wait(
+            {json_wait, card_wait},
+            timeout=_VOYAGER_WAIT_SECONDS,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in (json_wait, card_wait):
+            if task.done():
+                task.exception()
+            else:
+                task.cancel()
+        if not arrived.is_set() and card_wait.done():
+            # Cards can attach just before the JSON listener finishes parsing.
+            try:
+                await asyncio.wait_for(arrived.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _scrape_cards_dom(self, page: Page) -> list[dict]:
+        before = await page.evaluate("(sel) => document.querySelectorAll(sel).length", _CARD_SELECTOR)
         await page.mouse.wheel(0, 1000)
-        await asyncio.sleep(1)
+        try:
+            await page.wait_for_function(
+                "([sel, n]) => document.querySelectorAll(sel).length > n",
+                arg=[_CARD_SELECTOR, before],
+                timeout=1500,
+            )
+        except PlaywrightTimeoutError:
+            pass
 
         print("[SCRAPER] Buscando tarjetas de trabajo...")
 
-        possible_cards = await page.query_selector_all(
-            "li, div.job-card-container, div.base-card, div.job-search-card"
-        )
+        cards = await page.evaluate(_EXTRACT_CARDS_JS, _CARD_SELECTOR)
 
         results: list[dict] = []
-        seen_urls = set()
 
-        print(f"[SCRAPER] Analizando {len(possible_cards)} elementos...")
+        print(f"[SCRAPER] Analizando {len(cards)} elementos...")
 
-        for card in possible_cards:
-            try:
-                link_el = await card.query_selector("a[href*='/jobs/view/'], a[href*='currentJobId']")
-
-                if not link_el:
-                    continue
-
-                raw_url = await link_el.get_attribute("href")
-                if not raw_url:
-                    continue
-
-                job_url = raw_url.split("?")[0]
-                if not job_url.startswith("http"):
-                    job_url = f"https://www.linkedin.com{job_url}"
-
-                if job_url in seen_urls:
-                    continue
-                seen_urls.add(job_url)
-
-                title = "Unknown Title"
-                title_el = await card.query_selector(
-                    "strong, h3, .job-card-list__title, .base-search-card__title"
-                )
-                if title_el:
-                    title = (await title_el.inner_text()).strip()
-
-                company = "Unknown Company"
-                company_el = await card.query_selector(
-                    ".job-card-container__company-name, h4, .base-search-card__subtitle"
-                )
-                if company_el:
-                    company = (await company_el.inner_text()).strip()
-
-                text_content = (await card.inner_text()).lower()
-                is_easy_apply = (
-                    "easy apply" in text_content
-                    or "sencilla" in text_content
-                    or "facilmente" in text_content
-                )
-
-                print(f"   -> [ENCONTRADO] {title}")
-                results.append(
-                    {
-                        "title": title,
-                        "company": company,
-                        "url": job_url,
-                        "easy_apply": is_easy_apply,
-                    }
-                )
+        for card in cards:
+            job_url = card["url"]
+            if not job_url.startswith("http"):
+                job_url = f"https://www.linkedin.com{job_url}"
 
-            except Exception:
-                continue
+            print(f"   -> [ENCONTRADO] {card['title']}")
+            results.append(
+                {
+                    "title": card["title"],
+                    "company": card["company"],
+                    "url": job_url,
+                    "easy_apply": card["easy_apply"],
+                }
+            )
 
-        print(f"[SCRAPER] Total ofertas encontradas: {len(results)}")
         return results
 
+    async def _attach_descriptions(self, page: Page, jobs: list[dict]) -> None:
+        pending = []
+        for job in jobs:
+            key = job_key(job["url"])
+            if key.isdigit():
+                pending.append((job, key))
+        if not pending:
+            return
+
+        async def fetch(job_id: str) -> str:
+            async with self._sem:
+                return await page.evaluate(_FETCH_DESCRIPTION_JS, [_DESCRIPTION_ENDPOINT, job_id])
+
+        try:
+            texts = await asyncio.gather(*(fetch(job_id) for _, job_id in pending))
+        except Exception as exc:
+            print(f"[SCRAPER] No se pudieron obtener descripciones: {exc}")
+            return
+
+        for (job, _), text in zip(pending, texts):
+            if text:
+                job["description"] = text
+        print(f"[SCRAPER] Descripciones obtenidas: {sum(1 for t in texts if t)}/{len(pending)}")
+
     async def _lazy_scroll(self, page: Page) -> None:
         pass
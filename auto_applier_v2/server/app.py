@@ -1,14 +1,19 @@
-﻿import json
+﻿import hashlib
+import json
 import logging
 import os
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict
 
 import jwt
+import orjson
 from authlib.integrations.starlette_client import OAuth
+from cachetools import TTLCache
 from fastapi import Depends, FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from openai import OpenAI
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from openai import AsyncOpenAI
 from pydantic import BaseModel
 from starlette.middleware.sessions import SessionMiddleware
 
@@ -30,7 +35,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(APP_NAME)
 
-app = FastAPI(title=APP_NAME)
+app = FastAPI(title=APP_NAME, default_response_class=ORJSONResponse)
 app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET)
 
 oauth = OAuth()
@@ -43,9 +48,58 @@ if GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET:
         client_kwargs={"scope": "openid email profile"},
     )
 
-openai_client = OpenAI()
+openai_client = AsyncOpenAI()
+
+# user_id -> (tokens, last_refill); buckets hold a minute's worth of requests.
+_rate_state: Dict[str, tuple[float, float]] = {}
+# Nothing awaits while these locks are held, so plain locks stay correct under
+# the event loop and for the sync endpoints that run on worker threads.
+_rl_lock = threading.Lock()
+
+# Re-runs against the same CV send identical prompts; answer them from memory.
+_llm_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_llm_cache_lock = threading.Lock()
+
+_ANALYZE_HTML_PREFIX = (
+    "You are an expert form-filling AI agent. "
+    "Your goal is to map the User Profile Data to the HTML Form Fields provided.\n"
+    "INSTRUCTIONS:\n"
+    "1. Output MUST be strictly valid JSON: {\"field_id_or_name\": \"value\"}.\n"
+    "2. For <select> fields: You MUST pick one of the options listed in the HTML. "
+    "Pick the closest semantic match (e.g., if User is 'Spain' and options are 'ES', 'Espana', select that).\n"
+    "3. For Phone Code: If the select has country codes (e.g., 'Spain (+34)'), match the user's country.\n"
+    "4. For Experience/Years: Calculate from the CV data if possible, otherwise use a sensible default based on seniority.\n"
+    "5. NO Markdown, NO explanation text. Just the raw JSON string.\n\n"
+    "--- USER PROFILE ---\n"
+)
+_MATCH_PREFIX = (
+    "Role: Expert Tech Recruiter.\n"
+    "Task: Evaluate if the Candidate is a RELEVANT match for the Job Description.\n"
+    "Criteria:\n"
+    "- If the job requires specific hard skills (e.g. Java) and CV only has Python -> NO.\n"
+    "- If the roles are related (e.g. Job: 'SOC Analyst', CV: 'Cybersecurity Junior') -> YES.\n"
+    "- Ignore 'years of experience' requirements if the skills are strong.\n"
+    "- Be lenient with 'Junior' or 'Trainee' roles.\n"
+    "Output: Reply ONLY with the word 'YES' or 'NO'.\n\n"
+    "--- CANDIDATE CV ---\n"
+)
+_KEYWORDS_PREFIX = (
+    "Analyze this CV and extract the 5 BEST job search keywords for LinkedIn.\n"
+    "Focus on job titles (e.g. 'Pentester') and high-value skills (e.g. 'DevSecOps').\n"
+    "Format: Comma separated list. Example: Python, Django, React\n\n"
+    "CV TEXT: "
+)
+
+_JSON_DECODER = json.JSONDecoder()
 
-_rate_state: Dict[str, list[float]] = {}
+# sha256(token) -> decoded claims; hits still check "exp" themselves.
+_jwt_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+_jwt_cache_lock = threading.Lock()
+
+# user_id -> (user_data, serialized); a form sends the same profile for every page.
+_USER_JSON_MAX = 256
+_user_json_cache: "OrderedDict[str, tuple[Any, str]]" = OrderedDict()
+_user_json_lock = threading.Lock()
 
 
 class LLMRequest(BaseModel):
@@ -69,43 +123,80 @@ def _get_user_from_token(auth_header: str) -> Dict[str, Any]:
     if not auth_header or not auth_header.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = auth_header.split(" ", 1)[1].strip()
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    with _jwt_cache_lock:
+        claims = _jwt_cache.get(key)
+    if claims is not None and claims.get("exp", 0) > time.time():
+        return claims
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    with _jwt_cache_lock:
+        _jwt_cache[key] = claims
+    return claims
 
 
 def _enforce_rate_limit(user_id: str) -> None:
-    now = time.time()
-    window = 60
-    bucket = _rate_state.setdefault(user_id, [])
-    bucket[:] = [ts for ts in bucket if now - ts < window]
-    if len(bucket) >= RATE_LIMIT_PER_MIN:
+    now = time.monotonic()
+    rate = RATE_LIMIT_PER_MIN / 60
+    with _rl_lock:
+        tokens, last = _rate_state.get(user_id, (float(RATE_LIMIT_PER_MIN), now))
+        tokens = min(float(RATE_LIMIT_PER_MIN), tokens + (now - last) * rate)
+        allowed = tokens >= 1
+        _rate_state[user_id] = (tokens - 1 if allowed else tokens, now)
+    if not allowed:
         raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    bucket.append(now)
+
+
+def _user_json(user_id: str, user_data: Any) -> str:
+    with _user_json_lock:
+        cached = _user_json_cache.get(user_id)
+        if cached is not None and cached[0] == user_data:
+            _user_json_cache.move_to_end(user_id)
+            return cached[1]
+    serialized = orjson.dumps(user_data).decode("utf-8")
+    with _user_json_lock:
+        _user_json_cache[user_id] = (user_data, serialized)
+        _user_json_cache.move_to_end(user_id)
+        while len(_user_json_cache) > _USER_JSON_MAX:
+            _user_json_cache.popitem(last=False)
+    return serialized
 
 
 def _extract_json(text: str) -> Dict[str, Any]:
+    # json_mode replies are normally bare JSON; only prose-wrapped ones need the scan.
     try:
-        return json.loads(text)
-    except Exception:
+        obj = orjson.loads(text)
+        if isinstance(obj, dict):
+            return obj
+    except orjson.JSONDecodeError:
         pass
+    start = text.find("{")
+    if start == -1:
+        return {}
     try:
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            return json.loads(text[start : end + 1])
-    except Exception:
-        pass
-    return {}
+        obj, _ = _JSON_DECODER.raw_decode(text, start)
+    except ValueError:
+        return {}
+    return obj
 
 
-def _call_openai(prompt: str, json_mode: bool = False) -> str:
+async def _call_openai(prompt: str, json_mode: bool = False) -> str:
+    key = hashlib.sha256(f"{int(json_mode)}:{prompt}".encode("utf-8")).digest()
+    with _llm_cache_lock:
+        cached = _llm_cache.get(key)
+    if cached is not None:
+        return cached
+
     kwargs: Dict[str, Any] = {"model": OPENAI_MODEL, "input": prompt}
     if json_mode:
         kwargs["response_format"] = {"type": "json_object"}
-    response = openai_client.responses.create(**kwargs)
+    response = await openai_client.responses.create(**kwargs)
     output_text = getattr(response, "output_text", "") or ""
+    if output_text:
+        with _llm_cache_lock:
+            _llm_cache[key] = output_text
     return output_text
 
 
@@ -148,7 +239,7 @@ def auth_me(request: Request):
 
 
 @app.post("/api/llm")
-def llm_api(req: LLMRequest, request: Request):
+async def llm_api(req: LLMRequest, request: Request):
     user = _get_user_from_token(request.headers.get("Authorization", ""))
     user_id = str(user.get("sub"))
     _enforce_rate_limit(user_id)
@@ -160,54 +251,42 @@ def llm_api(req: LLMRequest, request: Request):
     if task == "analyze_html":
         html_snippet = str(payload.get("html_snippet", ""))
         user_data = payload.get("user_data", {})
-        prompt = (
-            "You are an expert form-filling AI agent. "
-            "Your goal is to map the User Profile Data to the HTML Form Fields provided.\n"
-            "INSTRUCTIONS:\n"
-            "1. Output MUST be strictly valid JSON: {\"field_id_or_name\": \"value\"}.\n"
-            "2. For <select> fields: You MUST pick one of the options listed in the HTML. "
-            "Pick the closest semantic match (e.g., if User is 'Spain' and options are 'ES', 'Espana', select that).\n"
-            "3. For Phone Code: If the select has country codes (e.g., 'Spain (+34)'), match the user's country.\n"
-            "4. For Experience/Years: Calculate from the CV data if possible, otherwise use a sensible default based on seniority.\n"
-            "5. NO Markdown, NO explanation text. Just the raw JSON string.\n\n"
-            f"--- USER PROFILE ---\n{json.dumps(user_data, ensure_ascii=False)}\n\n"
-            f"--- HTML FORM FIELDS ---\n{html_snippet}\n"
+        prompt = "".join(
+            (
+                _ANALYZE_HTML_PREFIX,
+                _user_json(user_id, user_data),
+                "\n\n--- HTML FORM FIELDS ---\n",
+                html_snippet,
+                "\n",
+            )
         )
-        text = _call_openai(prompt, json_mode=True)
+        text = await _call_openai(prompt, json_mode=True)
         result = _extract_json(text)
     elif task == "evaluate_match_bool":
-        job_description = str(payload.get("job_description", ""))
-        cv_text = str(payload.get("cv_text", ""))
+        job_description = str(payload.get("job_description", ""))[:6000]
+        cv_text = str(payload.get("cv_text", ""))[:6000]
         if not cv_text:
             result = True
         else:
-            prompt = (
-                "Role: Expert Tech Recruiter.\n"
-                "Task: Evaluate if the Candidate is a RELEVANT match for the Job Description.\n"
-                "Criteria:\n"
-                "- If the job requires specific hard skills (e.g. Java) and CV only has Python -> NO.\n"
-                "- If the roles are related (e.g. Job: 'SOC Analyst', CV: 'Cybersecurity Junior') -> YES.\n"
-                "- Ignore 'years of experience' requirements if the skills are strong.\n"
-                "- Be lenient with 'Junior' or 'Trainee' roles.\n"
-                "Output: Reply ONLY with the word 'YES' or 'NO'.\n\n"
-                f"--- JOB DESCRIPTION ---\n{job_description[:6000]}\n\n"
-                f"--- CANDIDATE CV ---\n{cv_text[:6000]}\n"
+            prompt = "".join(
+                (
+                    _MATCH_PREFIX,
+                    cv_text,
+                    "\n\n--- JOB DESCRIPTION ---\n",
+                    job_description,
+                    "\n",
+                )
             )
-            text = _call_openai(prompt)
+            text = await _call_openai(prompt)
             result = "YES" in text.strip().upper()
     elif task == "generate_keywords":
-        cv_text = str(payload.get("cv_text", ""))
-        prompt = (
-            "Analyze this CV and extract the 5 BEST job search keywords for LinkedIn.\n"
-            "Focus on job titles (e.g. 'Pentester') and high-value skills (e.g. 'DevSecOps').\n"
-            "Format: Comma separated list. Example: Python, Django, React\n\n"
-            f"CV TEXT: {cv_text[:4000]}"
-        )
-        text = _call_openai(prompt)
+        cv_text = str(payload.get("cv_text", ""))[:4000]
+        prompt = _KEYWORDS_PREFIX + cv_text
+        text = await _call_openai(prompt)
         result = [k.strip() for k in text.split(",") if k.strip()][:5]
     else:
         raise HTTPException(status_code=400, detail="Unknown task")
 
     elapsed_ms = int((time.time() - start) * 1000)
     logger.info("user_id=%s task=%s duration_ms=%s", user_id, task, elapsed_ms)
-    return JSONResponse({"result": result, "duration_ms": elapsed_ms})
+    return ORJSONResponse({"result": result, "duration_ms": elapsed_ms})
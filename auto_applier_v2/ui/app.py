@@ -10,6 +10,10 @@ import customtkinter as ctk
 
 from core.cv_context import CVContextManager
 
+# Tk slows down as the textbox grows; trim back to the newest lines past the cap.
+_LOG_MAX_LINES = 5000
+_LOG_KEEP_LINES = 4000
+
 
 @dataclass
 class UIState:
@@ -29,9 +33,12 @@ class App(ctk.CTk):
 
         self.ui_state = UIState()
         self.log_queue: queue.Queue[str] = queue.Queue()
+        # Filled by the token-loading thread, applied by _poll_logs on the Tk thread.
+        self._loaded_token_queue: queue.Queue[str] = queue.Queue()
         self.on_start = on_start
         self.on_pause = on_pause
         self.cv_context = ""
+        self.cv_summary = ""
         self.cv_context_manager = CVContextManager(
             cache_path=os.path.join(os.getcwd(), "config", "cv_context.json")
         )
@@ -130,8 +137,12 @@ class App(ctk.CTk):
         if not token:
             self.append_log("[UI] Auth token vacío.")
             return
-        os.makedirs(os.path.dirname(self.auth_token_path), exist_ok=True)
+        # Disk I/O runs off the Tk thread; append_log is queue-backed and thread-safe.
+        threading.Thread(target=self._write_auth_token, args=(token,), daemon=True).start()
+
+    def _write_auth_token(self, token: str) -> None:
         try:
+            os.makedirs(os.path.dirname(self.auth_token_path), exist_ok=True)
             with open(self.auth_token_path, "w", encoding="utf-8") as f:
                 f.write(token)
             self.append_log("[UI] Auth token guardado.")
@@ -139,20 +150,28 @@ class App(ctk.CTk):
             self.append_log("[UI] No se pudo guardar el auth token.")
 
     def _load_auth_token(self) -> None:
+        threading.Thread(target=self._read_auth_token, daemon=True).start()
+
+    def _read_auth_token(self) -> None:
         try:
             with open(self.auth_token_path, "r", encoding="utf-8") as f:
                 token = f.read().strip()
-                if token:
-                    self.auth_entry.delete(0, "end")
-                    self.auth_entry.insert(0, token)
         except Exception:
-            pass
+            return
+        if token:
+            self._loaded_token_queue.put(token)
+
+    def _apply_auth_token(self, token: str) -> None:
+        # Don't clobber a token the user typed while the file was being read.
+        if not self.auth_entry.get().strip():
+            self.auth_entry.insert(0, token)
 
     def _build_cv_context(self, path: str) -> None:
         self.append_log("[UI] Procesando CVs con Ollama...")
         context = self.cv_context_manager.build_context(path, self.append_log)
         if context:
             self.cv_context = context
+            self.cv_summary = self.cv_context_manager.build_skills_summary()
             self.append_log("[UI] Contexto de CV listo.")
         else:
             self.append_log("[UI] No se pudo generar contexto de CV.")
@@ -177,6 +196,7 @@ class App(ctk.CTk):
             "keywords": self.keywords_entry.get().strip(),
             "location": self.location_entry.get().strip(),
             "cv_context": self.cv_context,
+            "cv_summary": self.cv_summary,
         }
         self.ui_state.running = True
         self._set_status("Running")
@@ -207,13 +227,21 @@ class App(ctk.CTk):
         self.log_queue.put(message)
 
     def _poll_logs(self) -> None:
+        # One mutex acquisition per tick instead of one per get_nowait().
+        with self.log_queue.mutex:
+            lines = list(self.log_queue.queue)
+            self.log_queue.queue.clear()
+            self.log_queue.unfinished_tasks = max(0, self.log_queue.unfinished_tasks - len(lines))
+        if lines:
+            self.log_box.configure(state="normal")
+            self.log_box.insert("end", "\n".join(lines) + "\n")
+            end_line = int(self.log_box.index("end-1c").split(".")[0])
+            if end_line > _LOG_MAX_LINES:
+                self.log_box.delete("1.0", f"{end_line - _LOG_KEEP_LINES}.0")
+            self.log_box.see("end")
+            self.log_box.configure(state="disabled")
         try:
-            while True:
-                message = self.log_queue.get_nowait()
-                self.log_box.configure(state="normal")
-                self.log_box.insert("end", message + "\n")
-                self.log_box.see("end")
-                self.log_box.configure(state="disabled")
+            self._apply_auth_token(self._loaded_token_queue.get_nowait())
         except queue.Empty:
             pass
         self.after(100, self._poll_logs)
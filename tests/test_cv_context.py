@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "auto_applier_v2"))
+
+from core.cv_context import summarize_cv  # noqa: E402
+
+# Shaped like PyMuPDF output: no blank lines between sections.
+SAMPLE_CV = """--- CV: jane_doe.pdf ---
+Jane Doe
+Madrid, Spain
+Skills
+Python, SQL, Docker
+Burp Suite; Wireshark
+Splunk
+Experience
+SOC Analyst - Acme Corp
+2021 - Present
+Monitored alerts for a retailer. Company founded 25 years ago.
+Junior Pentester - Contoso
+3 years of experience in offensive security.
+Education
+BSc Computer Engineering
+Languages
+Spanish, English
+"""
+
+
+class SummarizeCvTest(unittest.TestCase):
+    def test_sections_end_at_next_heading(self):
+        summary = summarize_cv(SAMPLE_CV)
+        lines = dict(line.split(": ", 1) for line in summary.splitlines())
+
+        self.assertEqual(
+            lines["- Skills"], "Python, SQL, Docker, Burp Suite, Wireshark, Splunk"
+        )
+        self.assertIn("SOC Analyst - Acme Corp", lines["- Titles"])
+        self.assertIn("Junior Pentester - Contoso", lines["- Titles"])
+        self.assertEqual(lines["- Experience"], "3 years")
+
+    def test_each_part_keeps_its_budget_with_many_cvs(self):
+        many = "\n".join(
+            SAMPLE_CV.replace("Splunk", f"Splunk, Tool{i}a, Tool{i}b") for i in range(40)
+        )
+        summary = summarize_cv(many)
+
+        self.assertLessEqual(len(summary), 600)
+        self.assertIn("- Titles: ", summary)
+        self.assertIn("- Experience: 3 years", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "auto_applier_v2"))
+
+from core.tracker import JobTracker, job_key  # noqa: E402
+from scrapers.linkedin import _parse_voyager_jobs  # noqa: E402
+
+
+def _day(days_ago: int) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(time.time() - days_ago * 86400))
+
+
+class JobKeyTest(unittest.TestCase):
+    def test_both_linkedin_url_shapes_share_the_id(self):
+        self.assertEqual(job_key("https://www.linkedin.com/jobs/view/4012345678/"), "4012345678")
+        self.assertEqual(
+            job_key("https://es.linkedin.com/jobs/view/python-developer-at-acme-4012345678?trk=x"),
+            "4012345678",
+        )
+
+    def test_non_job_urls_fall_back_to_the_url(self):
+        self.assertEqual(job_key("https://example.com/careers/1"), "https://example.com/careers/1")
+        self.assertEqual(job_key(""), "")
+
+
+class TrackedJobKeysTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "tracking.jsonl")
+        rows = [
+            (_day(0), "APLICADO", "https://www.linkedin.com/jobs/view/1/"),
+            (_day(1), "SKIPPED", "https://es.linkedin.com/jobs/view/data-scout-2"),
+            (_day(0), "ERROR", "https://www.linkedin.com/jobs/view/3/"),
+            (_day(2), "FALLIDO", "https://www.linkedin.com/jobs/view/4/"),
+            (_day(30), "APLICADO", "https://www.linkedin.com/jobs/view/5/"),
+            (_day(0), "SALTADO", "N/A"),
+        ]
+        with open(self.path, "w", encoding="utf-8") as f:
+            for fecha, estado, url in rows:
+                f.write(json.dumps({"Fecha": fecha, "Hora": "10:00:00", "Estado": estado, "URL": url}) + "\n")
+            f.write("not json\n")
+        with mock.patch.object(JobTracker, "_import_legacy_excel"):
+            self.tracker = JobTracker(filename=self.path)
+
+    def tearDown(self):
+        self.tracker.close()
+        self._tmp.cleanup()
+
+    def test_recent_final_outcomes_are_skipped(self):
+        self.assertEqual(self.tracker.tracked_job_keys(max_age_days=7), {"1", "2"})
+
+    def test_retry_statuses_and_cutoff_are_configurable(self):
+        self.assertEqual(
+            self.tracker.tracked_job_keys(max_age_days=60, retry_statuses=("ERROR",)),
+            {"1", "2", "4", "5"},
+        )
+
+
+class ParseVoyagerJobsTest(unittest.TestCase):
+    def test_minimal_included_payload(self):
+        payload = {
+            "data": {},
+            "included": [
+                {
+                    "jobPostingTitle": " SOC Analyst ",
+                    "*jobPosting": "urn:li:fsd_jobPosting:4012345678",
+                    "primaryDescription": {"text": "Acme Corp"},
+                    "footerItems": [{"type": "EASY_APPLY_TEXT"}],
+                },
+                {
+                    "jobPostingTitle": "Junior Pentester",
+                    "jobPostingUrn": "urn:li:fsd_jobPosting:4087654321",
+                    "footerItems": [{"type": "LISTED_DATE"}],
+                },
+                {"entityUrn": "urn:li:fsd_company:1", "name": "Acme Corp"},
+                {"jobPostingTitle": "No urn"},
+            ],
+        }
+
+        self.assertEqual(
+            _parse_voyager_jobs(payload),
+            [
+                {
+                    "title": "SOC Analyst",
+                    "company": "Acme Corp",
+                    "url": "https://www.linkedin.com/jobs/view/4012345678/",
+                    "easy_apply": True,
+                },
+                {
+                    "title": "Junior Pentester",
+                    "company": "Unknown Company",
+                    "url": "https://www.linkedin.com/jobs/view/4087654321/",
+                    "easy_apply": False,
+                },
+            ],
+        )
+        self.assertEqual(_parse_voyager_jobs({}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
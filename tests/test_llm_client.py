@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "auto_applier_v2"))
+
+from core import llm_client  # noqa: E402
+from core.llm_client import LLMClient  # noqa: E402
+
+
+class LLMClientTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self._tmp.name, "llm_cache.json")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _match(self, client, reply="YES"):
+        calls = []
+
+        async def fake_chat(messages, temperature=0.2):
+            calls.append(messages)
+            return reply
+
+        with mock.patch.object(llm_client, "claw_chat_async", fake_chat):
+            result = asyncio.run(client.evaluate_match_bool("Python developer", "Python, SQL"))
+        return result, calls
+
+    def test_match_cache_is_namespaced_by_model(self):
+        with mock.patch.object(llm_client, "current_model", return_value="model-a"):
+            client = LLMClient(cache_path=self.cache_path)
+        self.assertEqual(len(self._match(client)[1]), 1)
+        self.assertEqual(self._match(client)[1], [])
+        client.save()
+
+        with mock.patch.object(llm_client, "current_model", return_value="model-a"):
+            same = LLMClient(cache_path=self.cache_path)
+        self.assertEqual(self._match(same, reply="NO"), (True, []))
+
+        with mock.patch.object(llm_client, "current_model", return_value="model-b"):
+            other = LLMClient(cache_path=self.cache_path)
+        result, calls = self._match(other, reply="NO")
+        self.assertFalse(result)
+        self.assertEqual(len(calls), 1)
+
+    def test_match_cache_is_namespaced_by_instructions(self):
+        client = LLMClient(cache_path=self.cache_path)
+        self._match(client)
+        client.save()
+
+        with mock.patch.object(llm_client, "_MATCH_INSTRUCTIONS", "Reply YES or NO.\n"):
+            changed = LLMClient(cache_path=self.cache_path)
+            result, calls = self._match(changed, reply="NO")
+        self.assertFalse(result)
+        self.assertEqual(len(calls), 1)
+
+    def test_extract_json(self):
+        client = LLMClient(cache_path=self.cache_path)
+        self.assertEqual(
+            client._extract_json('Sure! {"email": "a@b.c", "nested": {"x": 1}} trailing {'),
+            {"email": "a@b.c", "nested": {"x": 1}},
+        )
+        self.assertIsNone(client._extract_json("no json here"))
+        self.assertIsNone(client._extract_json("{broken"))
+
+
+if __name__ == "__main__":
+    unittest.main()